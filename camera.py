@@ -1,8 +1,8 @@
 
 # Import Python modules
-if __name__ == '__main__':
-    import glm
-    import pygame as pg
+import glm
+import math
+import pygame as pg
 
 # Camera constants
 FOV = 50 # Field of view in degrees
@@ -10,6 +10,7 @@ NEAR = 0.1 # Near clipping plane distance
 FAR = 100 # Far clipping plane distance
 SPEED = 0.01 # Camera movement speed
 SENSITIVITY = 0.05 # Mouse look sensitivity
+DEG_TO_RAD = math.pi / 180 # Degrees to radians factor
 
 class Camera:
     """
@@ -43,18 +44,49 @@ class Camera:
         # Setup orientations
         self.yaw = yaw
         self.pitch = pitch
-        # View matrix
-        self.m_view = self.get_view_matrix()
+        # Movement keys: forward, back, left, right, up, down
+        self.move_keys = (pg.K_w, pg.K_s, pg.K_a, pg.K_d, pg.K_q, pg.K_e)
         # Projection matrix
+        # NOTE: Frame-invariant; do not call glm.perspective in hot paths, use on_resize() instead
         self.m_proj = self.get_projection_matrix()
+        self.m_proj_inv = glm.inverse(self.m_proj)
+        # View matrix
+        self.m_view = self.get_view_matrix()
+        self.update_view_matrices()
+
+    def on_resize(self, width, height):
+        """
+        Recalculate the cached projection matrix for a new window size.
+
+        Writes the new projection matrices to every shader program that uses them.
 
-    def rotate(self):
+        :param width: New window width in pixels
+        :type width: int
+        :param height: New window height in pixels
+        :type height: int
+        """
+        self.aspect_ratio = width / height
+        self.m_proj = self.get_projection_matrix()
+        self.m_proj_inv = glm.inverse(self.m_proj)
+        self.update_view_matrices()
+        # NOTE: Shadow mapping reuses the camera's projection from the light's point of view
+        m_proj_view_light = self.m_proj * self.app.light.m_view_light
+        for program in self.app.mesh.vao.program.programs.values():
+            for name, matrix in (('m_proj', self.m_proj), ('m_proj_view_light', m_proj_view_light)):
+                uniform = program.get(name, None)
+                if uniform is not None:
+                    uniform.write(matrix)
+
+    def rotate(self, mouse_rel):
         """
         Update camera yaw and pitch based on mouse movement.
 
         Applies sensitivity scaling and clamps pitch to prevent over-rotation.
+
+        :param mouse_rel: Mouse movement since the last frame (x, y)
+        :type mouse_rel: tuple
         """
-        rel_x, rel_y = pg.mouse.get_rel()
+        rel_x, rel_y = mouse_rel
         self.yaw += rel_x * SENSITIVITY
         self.pitch -= rel_y * SENSITIVITY
         self.pitch = max(-89, min(89, self.pitch))
@@ -65,49 +97,75 @@ class Camera:
 
         Uses spherical coordinates to convert yaw/pitch angles to 3D direction vectors.
         """
-        yaw = glm.radians(self.yaw)
-        pitch = glm.radians(self.pitch)
-
-        self.forward.x = glm.cos(yaw) * glm.cos(pitch)
-        self.forward.y = glm.sin(pitch)
-        self.forward.z = glm.sin(yaw) * glm.cos(pitch)
-
-        self.forward = glm.normalize(self.forward)
-        self.right = glm.normalize(glm.cross(self.forward, glm.vec3(0, 1, 0)))
-        self.up = glm.normalize(glm.cross(self.right, self.forward))
-
-    def update(self):
+        # NOTE: Plain float math avoids a glm call per scalar operation
+        yaw = self.yaw * DEG_TO_RAD
+        pitch = self.pitch * DEG_TO_RAD
+        cy, sy = math.cos(yaw), math.sin(yaw)
+        cp, sp = math.cos(pitch), math.sin(pitch)
+
+        # NOTE: forward is already unit length, since cp^2 * (cy^2 + sy^2) + sp^2 = 1
+        self.forward.x = cy * cp
+        self.forward.y = sp
+        self.forward.z = sy * cp
+
+        # right = normalize(cross(forward, (0, 1, 0))) = (-sy, 0, cy), since pitch is clamped below 90 degrees
+        self.right.x = -sy
+        self.right.y = 0.0
+        self.right.z = cy
+
+        # up = cross(right, forward), already unit length because right and forward are orthonormal
+        self.up.x = -cy * sp
+        self.up.y = cp
+        self.up.z = -sy * sp
+
+    def update(self, keys, mouse_rel):
         """
         Update camera position and orientation each frame.
 
         Handles movement, rotation, and recalculates view matrix.
+
+        :param keys: Keyboard state from pg.key.get_pressed()
+        :type keys: ScancodeWrapper
+        :param mouse_rel: Mouse movement since the last frame (x, y)
+        :type mouse_rel: tuple
         """
-        self.move()
-        self.rotate()
+        self.move(keys)
+        self.rotate(mouse_rel)
         self.update_camera_vectors()
         # Re-calculate the view matrix
         self.m_view = self.get_view_matrix()
+        self.update_view_matrices()
 
-    def move(self):
+    def update_view_matrices(self):
+        """
+        Recalculate the matrices derived from the view matrix.
+
+        Computed once per frame so models and skyboxes can share them.
+        """
+        self.m_proj_view = self.m_proj * self.m_view
+        # NOTE: Removes the translation so the skybox stays centered around the camera
+        m_view_rot = glm.mat3(self.m_view)
+        self.m_view_no_translation = glm.mat4(m_view_rot)
+        # NOTE: (P * V)^-1 = V^-1 * P^-1, and a rotation's inverse is its transpose
+        self.m_inv_proj_view_skybox = glm.mat4(glm.transpose(m_view_rot)) * self.m_proj_inv
+
+    def move(self, keys):
         """
         Handle keyboard input for camera movement in 3D space.
 
         Uses WASD for horizontal movement and QE for vertical movement.
+
+        :param keys: Keyboard state from pg.key.get_pressed()
+        :type keys: ScancodeWrapper
         """
-        velocity = SPEED * self.app.delta_time
-        keys = pg.key.get_pressed()
-        if keys[pg.K_w]:
-            self.position += self.forward * velocity
-        if keys[pg.K_s]:
-            self.position -= self.forward * velocity
-        if keys[pg.K_a]:
-            self.position -= self.right * velocity
-        if keys[pg.K_d]:
-            self.position += self.right * velocity
-        if keys[pg.K_q]:
-            self.position += self.up * velocity
-        if keys[pg.K_e]:
-            self.position -= self.up * velocity
+        key_w, key_s, key_a, key_d, key_q, key_e = self.move_keys
+        # NOTE: Each axis is -1, 0, or 1 depending on which opposing keys are held
+        dz = keys[key_w] - keys[key_s]
+        dx = keys[key_d] - keys[key_a]
+        dy = keys[key_q] - keys[key_e]
+        if dx or dy or dz:
+            velocity = SPEED * self.app.delta_time
+            self.position += (self.forward * dz + self.right * dx + self.up * dy) * velocity
 
     def get_view_matrix(self):
         """
@@ -122,6 +180,8 @@ class Camera:
         """
         Calculate perspective projection matrix.
 
+        Only called on construction and resize; read the cached m_proj instead.
+
         :return: Projection matrix for perspective transformation
         :rtype: mat4
         """
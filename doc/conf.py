@@ -20,6 +20,9 @@ author = 'papadanku'
 
 extensions = ["sphinx.ext.todo", "sphinx.ext.viewcode", "sphinx.ext.autodoc"]
 
+# NOTE: The documentation build only installs Sphinx, so autodoc stubs out the runtime libraries
+autodoc_mock_imports = ['glm', 'numpy', 'moderngl', 'pygame', 'pywavefront', 'numba']
+
 templates_path = ['_templates']
 exclude_patterns = ['_build', 'Thumbs.db', '.DS_Store']
 
@@ -1,7 +1,6 @@
 
 # Import Python modules
-if __name__ == '__main__':
-    import glm
+import glm
 
 class Light:
     """
@@ -29,6 +28,16 @@ class Light:
         # View matrix
         self.m_view_light = self.get_view_matrix()
 
+    def get_uniform_data(self):
+        """
+        Pack light position and intensities for the shaders' LightBlock uniform block.
+
+        :return: Light data in std140 layout (each vec3 padded to a vec4)
+        :rtype: bytes
+        """
+        data = [self.position, self.Ia, self.Id, self.Is]
+        return b''.join(glm.vec4(value, 0.0).to_bytes() for value in data)
+
     def get_view_matrix(self):
         """
         Calculate light view matrix for shadow mapping.
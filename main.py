@@ -4,10 +4,10 @@ This module initializes the main graphics application
 """
 
 # Import Python modules
-if __name__ == '__main__':
-    import moderngl as mgl
-    import pygame as pg
-    import sys
+import moderngl as mgl
+import pygame as pg
+import sys
+import time
 
 # Import application modules
 from camera import Camera
@@ -41,7 +41,17 @@ class GraphicsEngine():
         pg.display.gl_set_attribute(pg.GL_CONTEXT_MINOR_VERSION, 3)
         pg.display.gl_set_attribute(pg.GL_CONTEXT_PROFILE_MASK, pg.GL_CONTEXT_PROFILE_CORE)
         # Create OpenGL context
-        pg.display.set_mode(self.WIN_SIZE, flags=pg.OPENGL | pg.DOUBLEBUF)
+        # NOTE: With vsync, frame pacing comes from pg.display.flip() blocking until the next vblank
+        try:
+            pg.display.set_mode(self.WIN_SIZE, flags=pg.OPENGL | pg.DOUBLEBUF, vsync=1)
+            self.vsync = True
+            # NOTE: Safety cap above any refresh rate, in case the driver silently ignores vsync
+            self.max_fps = 240
+        except pg.error:
+            # NOTE: Drivers without swap control reject vsync, so cap the loop with a timer instead
+            pg.display.set_mode(self.WIN_SIZE, flags=pg.OPENGL | pg.DOUBLEBUF)
+            self.vsync = False
+            self.max_fps = 60
         # Mouse settings
         pg.event.set_grab(True)
         pg.mouse.set_visible(False)
@@ -49,10 +59,12 @@ class GraphicsEngine():
         # NOTE: Contexts provides API functions such renderstates, buffers, etc.
         self.ctx = mgl.create_context()
         self.ctx.enable(flags=mgl.DEPTH_TEST | mgl.CULL_FACE)
-        # Create an object to help track time
-        self.clock = pg.time.Clock()
+        # Track time with the high-resolution monotonic timer
         self.time = 0
         self.delta_time = 0
+        self.last_frame_time = time.perf_counter()
+        # Cap the frame rate at max_fps
+        self.clock = pg.time.Clock()
         # Create light data (positions, transformation)
         self.light = Light()
         # Create camera data (positions, transformations)
@@ -72,17 +84,25 @@ class GraphicsEngine():
         """
         self.time = pg.time.get_ticks() * 0.001
 
-    def check_events(self):
+    def check_events(self, events):
         """
-        Process PyGame events and handle window close/escape key.
+        Process PyGame events and handle window resize, close, and escape key.
 
         Cleans up resources and exits application when quit event occurs.
+
+        Args:
+            events: Events polled from the queue this frame
         """
-        for event in pg.event.get():
+        for event in events:
+            if event.type == pg.VIDEORESIZE:
+                # Only recalculate the projection matrix when the window changes
+                self.ctx.screen.viewport = (0, 0, event.w, event.h)
+                self.camera.on_resize(event.w, event.h)
             if event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE):
                 # Release everything from memory
                 self.mesh.destroy()
                 self.scene_renderer.destroy()
+                self.scene.destroy()
                 pg.quit()
                 sys.exit()
 
@@ -103,14 +123,24 @@ class GraphicsEngine():
         """
         Main game loop that updates time, processes events, updates camera, and renders scene.
 
-        Runs at 60 FPS and maintains consistent delta time for smooth animations.
+        Runs at the display's refresh rate (vsync), or at max_fps if vsync is unavailable,
+        and measures delta time in milliseconds from the wall clock for smooth animations.
         """
         while True:
             self.get_time()
-            self.check_events()
-            self.camera.update()
+            # NOTE: Pump the queue once, then read every input snapshot from that same state
+            pg.event.pump()
+            events = pg.event.get(pump=False)
+            keys = pg.key.get_pressed()
+            mouse_rel = pg.mouse.get_rel()
+            self.check_events(events)
+            self.camera.update(keys=keys, mouse_rel=mouse_rel)
             self.render()
-            self.delta_time = self.clock.tick(60)
+            # NOTE: With vsync, max_fps is above the refresh rate, so this never waits on top of the vblank
+            self.clock.tick(self.max_fps)
+            now = time.perf_counter()
+            self.delta_time = (now - self.last_frame_time) * 1000.0
+            self.last_frame_time = now
 
 if __name__ == '__main__':
     app = GraphicsEngine()
@@ -4,8 +4,119 @@ This module processes uniform attributes for the appropriate model
 """
 
 # Import Python modules
-if __name__ == '__main__':
-    import glm
+import glm
+import math
+import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    # NOTE: Without Numba, the kernels below run as plain Python
+    def njit(*args, **kwargs):
+        return lambda function: function
+
+# Import application modules
+from shader_program import MODEL_BINDING
+
+
+def get_model_matrix(pos, rot, scale):
+    """
+    Calculate model matrix combining translation, rotation, and scale.
+
+    :param pos: Position in world coordinates (x, y, z)
+    :type pos: tuple
+    :param rot: Rotation in radians (x, y, z)
+    :type rot: vec3
+    :param scale: Scale factors (x, y, z)
+    :type scale: tuple
+    :return: Model transformation matrix
+    :rtype: mat4
+    """
+    # NOTE: This is just an identity matrix
+    m_model = glm.mat4()
+    # Translate
+    m_model = glm.translate(m_model, pos)
+    # Rotate
+    m_model = glm.rotate(m_model, rot.z, glm.vec3(0, 0, 1))
+    m_model = glm.rotate(m_model, rot.y, glm.vec3(0, 1, 0))
+    m_model = glm.rotate(m_model, rot.x, glm.vec3(1, 0, 0))
+    # Scale
+    m_model = glm.scale(m_model, scale)
+    return m_model
+
+
+def get_model_matrices(positions, rotations, scales):
+    """
+    Pack the model matrices of many static objects into one contiguous float32 array.
+
+    :param positions: Position of each object in world coordinates
+    :type positions: list
+    :param rotations: Rotation of each object in degrees
+    :type rotations: list
+    :param scales: Scale factors of each object
+    :type scales: list
+    :return: Array with one column-major model matrix per row, shaped (N, 16)
+    :rtype: numpy.ndarray
+    """
+    m_models = np.empty((len(positions), 16), dtype='f4')
+    for i, (pos, rot, scale) in enumerate(zip(positions, rotations, scales)):
+        rot = glm.vec3([glm.radians(a) for a in rot])
+        # NOTE: to_bytes() keeps glm's column-major layout, which is what OpenGL expects
+        m_models[i] = np.frombuffer(get_model_matrix(pos, rot, scale).to_bytes(), dtype='f4')
+    return m_models
+
+
+def get_translation_matrices(positions):
+    """
+    Pack translation-only model matrices for objects with no rotation and unit scale.
+
+    :param positions: Position of each object in world coordinates, shaped (N, 3)
+    :type positions: numpy.ndarray
+    :return: Array with one column-major model matrix per row, shaped (N, 16)
+    :rtype: numpy.ndarray
+    """
+    m_models = np.zeros((len(positions), 16), dtype='f4')
+    # NOTE: Diagonal of the identity, then the translation in the last column
+    m_models[:, [0, 5, 10, 15]] = 1.0
+    m_models[:, 12:15] = positions
+    return m_models
+
+
+@njit('void(f4[:], f4[:], f4[:], f4[:])', cache=True)
+def build_model_matrix(out16, pos3, rot3, scale3):
+    """
+    Write the model matrix of get_model_matrix() into a column-major float32 buffer.
+
+    Compiled with Numba so dynamic models rebuild their matrix without glm calls.
+
+    :param out16: Output buffer of 16 floats (column-major)
+    :type out16: numpy.ndarray
+    :param pos3: Position in world coordinates (x, y, z)
+    :type pos3: numpy.ndarray
+    :param rot3: Rotation in radians (x, y, z)
+    :type rot3: numpy.ndarray
+    :param scale3: Scale factors (x, y, z)
+    :type scale3: numpy.ndarray
+    """
+    cx, sx = math.cos(rot3[0]), math.sin(rot3[0])
+    cy, sy = math.cos(rot3[1]), math.sin(rot3[1])
+    cz, sz = math.cos(rot3[2]), math.sin(rot3[2])
+    # NOTE: Columns of translate * rotate(z) * rotate(y) * rotate(x) * scale
+    out16[0] = cz * cy * scale3[0]
+    out16[1] = sz * cy * scale3[0]
+    out16[2] = -sy * scale3[0]
+    out16[3] = 0.0
+    out16[4] = (cz * sy * sx - sz * cx) * scale3[1]
+    out16[5] = (sz * sy * sx + cz * cx) * scale3[1]
+    out16[6] = cy * sx * scale3[1]
+    out16[7] = 0.0
+    out16[8] = (cz * sy * cx + sz * sx) * scale3[2]
+    out16[9] = (sz * sy * cx - cz * sx) * scale3[2]
+    out16[10] = cy * cx * scale3[2]
+    out16[11] = 0.0
+    out16[12] = pos3[0]
+    out16[13] = pos3[1]
+    out16[14] = pos3[2]
+    out16[15] = 1.0
 
 
 class BaseModel:
@@ -33,16 +144,55 @@ class BaseModel:
         :type scale: tuple
         """
         self.app = app
+        self._model_dirty = True
         self.pos = pos
         self.vao_name = vao_name
         self.rot = glm.vec3([glm.radians(a) for a in rot])
         self.scale = scale
-        self.m_model = self.get_model_matrix()
+        self.update_model_matrix()
         self.tex_id = tex_id
-        self.vao = app.mesh.vao.vaos[vao_name]
+        self.vao = app.mesh.vao[vao_name]
         self.program = self.vao.program
         self.camera = self.app.camera
 
+    @property
+    def pos(self):
+        """
+        Position in world coordinates (x, y, z).
+        """
+        return self._pos
+
+    @pos.setter
+    def pos(self, pos):
+        self._pos = pos
+        self._model_dirty = True
+
+    @property
+    def rot(self):
+        """
+        Rotation in radians (x, y, z).
+
+        NOTE: Mutating the vector in place does not mark the model matrix as dirty.
+        """
+        return self._rot
+
+    @rot.setter
+    def rot(self, rot):
+        self._rot = rot
+        self._model_dirty = True
+
+    @property
+    def scale(self):
+        """
+        Scale factors (x, y, z).
+        """
+        return self._scale
+
+    @scale.setter
+    def scale(self, scale):
+        self._scale = scale
+        self._model_dirty = True
+
     def update(self):
         """
         Update model state before rendering.
@@ -52,6 +202,16 @@ class BaseModel:
 
         pass
 
+    def update_model_matrix(self):
+        """
+        Recalculate the cached model matrix only if the transform changed.
+        """
+        if self._model_dirty:
+            self.m_model = self.get_model_matrix()
+            # NOTE: Keep the matrix's bytes, so uploads do not convert it again every frame
+            self.m_model_bytes = self.m_model.to_bytes()
+            self._model_dirty = False
+
     def get_model_matrix(self):
         """
         Calculate model matrix combining translation, rotation, and scale.
@@ -59,17 +219,7 @@ class BaseModel:
         :return: Model transformation matrix
         :rtype: mat4
         """
-        # NOTE: This is just an identity matrix
-        m_model = glm.mat4()
-        # Translate
-        m_model = glm.translate(m_model, self.pos)
-        # Rotate
-        m_model = glm.rotate(m_model, self.rot.z, glm.vec3(0, 0, 1))
-        m_model = glm.rotate(m_model, self.rot.y, glm.vec3(0, 1, 0))
-        m_model = glm.rotate(m_model, self.rot.x, glm.vec3(1, 0, 0))
-        # Scale
-        m_model = glm.scale(m_model, self.scale)
-        return m_model
+        return get_model_matrix(self.pos, self.rot, self.scale)
 
     def render(self):
         """
@@ -78,61 +228,102 @@ class BaseModel:
         self.update()
         self.vao.render()
 
+    def destroy(self):
+        """
+        Release GPU resources owned by the model.
+
+        Subclasses override this method if they own any.
+        """
+
+        pass
+
 
 class ExtendedBaseModel(BaseModel):
     """
     Subclass for an application's main objects
     """
 
+    # NOTE: Subclasses that read model matrices from elsewhere turn this off, to skip allocating the buffer
+    uses_model_ubo = True
+
     def __init__(self, app, vao_name, tex_id, pos, rot, scale):
+        # NOTE: Both passes read the model matrix from this buffer, so it is uploaded once per change
+        self.m_model_ubo = app.ctx.buffer(reserve=64) if self.uses_model_ubo else None
         super().__init__(app, vao_name, tex_id, pos, rot, scale)
         self.on_init()
 
+    def update_model_matrix(self):
+        """
+        Recalculate the cached model matrix and upload it only if the transform changed.
+        """
+        if self._model_dirty:
+            super().update_model_matrix()
+            if self.m_model_ubo is not None:
+                self.m_model_ubo.write(self.m_model_bytes)
+
     def update(self):
         """
         Update dynamic uniform attributes
         """
 
         self.texture.use(location=0)
-        self.program['camPos'].write(self.camera.position)
-        self.program['m_view'].write(self.camera.m_view)
-        self.program['m_model'].write(self.m_model)
+        self.update_model_matrix()
+        self._u_cam_pos.write(self.camera.position)
+        # NOTE: The program is shared between models, so the cached matrix still has to be written per draw
+        self._u_mvp.write(self.camera.m_proj_view * self.m_model)
+        self.m_model_ubo.bind_to_uniform_block(MODEL_BINDING)
 
     def update_shadow(self):
-        self.shadow_program['m_model'].write(self.m_model)
+        # NOTE: The shadow pass runs first, so it uploads the frame's model matrix for the main pass too
+        self.update_model_matrix()
+        self.m_model_ubo.bind_to_uniform_block(MODEL_BINDING)
 
     def render_shadow(self):
         self.update_shadow()
         self.shadow_vao.render()
 
     def on_init(self):
-        self.program['m_view_light'].write(self.app.light.m_view_light)
+        # NOTE: Bind the objects used below to locals, so each chain is only walked once per model
+        app = self.app
+        m_view_light = app.light.m_view_light
+        m_proj = self.camera.m_proj
+        textures = app.mesh.texture.textures
+        program = self.program
+        # Matrices
+        # NOTE: .write(x) is a function that gives the shader program a specified attribute
+        # NOTE: u_mvp is written by update() right before each draw, m_model lives in m_model_ubo
+        program['m_proj_view_light'].write(m_proj * m_view_light)
         # Viewport resolution
-        self.program['u_resolution'].write(glm.vec2(self.app.WIN_SIZE))
+        program['u_resolution'].write(glm.vec2(app.WIN_SIZE))
         # Depth texture
-        self.depth_texture = self.app.mesh.texture.textures['depth_texture']
-        self.program['shadowMap'] = 1
+        self.depth_texture = textures['depth_texture']
+        program['shadowMap'] = 1
         self.depth_texture.use(location=1)
         # Shadow
-        self.shadow_vao = self.app.mesh.vao.vaos['shadow_' + self.vao_name]
-        self.shadow_program = self.shadow_vao.program
-        self.shadow_program['m_proj'].write(self.camera.m_proj)
-        self.shadow_program['m_view_light'].write(self.app.light.m_view_light)
-        self.shadow_program['m_model'].write(self.m_model)
+        self.shadow_vao = app.mesh.vao['shadow_' + self.vao_name]
+        self.shadow_program = shadow_program = self.shadow_vao.program
+        shadow_program['m_proj'].write(m_proj)
+        shadow_program['m_view_light'].write(m_view_light)
         # Texture
-        self.texture = self.app.mesh.texture.textures[self.tex_id]
-        self.program['u_texture_0'] = 0
+        self.texture = textures[self.tex_id]
+        program['u_texture_0'] = 0
         self.texture.use(location=0)
-        # Matrices
-        # NOTE: .write(x) is a function that gives the shader program a specified attribute
-        self.program['m_proj'].write(self.camera.m_proj)
-        self.program['m_view'].write(self.camera.m_view)
-        self.program['m_model'].write(self.m_model)
-        # Light uniform attributes
-        self.program['light.position'].write(self.app.light.position)
-        self.program['light.Ia'].write(self.app.light.Ia)
-        self.program['light.Id'].write(self.app.light.Id)
-        self.program['light.Is'].write(self.app.light.Is)
+        # NOTE: Light uniform attributes come from the shared LightBlock buffer bound by SceneRenderer
+        self.cache_uniforms()
+
+    def cache_uniforms(self):
+        """
+        Look up the uniforms written every frame once, instead of on every update.
+        """
+        self._u_cam_pos = self.program['camPos']
+        self._u_mvp = self.program['u_mvp']
+
+    def destroy(self):
+        """
+        Release the model matrix buffer.
+        """
+        if self.m_model_ubo is not None:
+            self.m_model_ubo.release()
 
 
 class Cube(ExtendedBaseModel):
@@ -169,16 +360,102 @@ class MovingCube(Cube):
         """
         Initialize moving cube with same parameters as base cube.
         """
+        # NOTE: Persistent float32 buffers, so rebuilding the matrix every frame does not allocate
+        self.pos3 = np.empty(3, dtype='f4')
+        self.rot3 = np.empty(3, dtype='f4')
+        self.scale3 = np.empty(3, dtype='f4')
+        # NOTE: m_model is created once and never replaced, so its views below stay attached to it
+        self.m_model = glm.mat4()
+        # NOTE: Column-major view of m_model's memory, so build_model_matrix() writes into it directly
+        self.m_model16 = np.asarray(self.m_model).T.reshape(16)
+        # NOTE: Persistent zero-copy view of the same memory for uniform uploads
+        self.m_model_bytes = memoryview(self.m_model16).cast('B')
         super().__init__(*args, **kwargs)
 
-    def update(self):
+    def update_model_matrix(self):
+        """
+        Rebuild the model matrix in place and upload it only if the transform changed.
+        """
+        if self._model_dirty:
+            self.pos3[:] = self.pos
+            self.rot3[:] = self.rot
+            self.scale3[:] = self.scale
+            build_model_matrix(self.m_model16, self.pos3, self.rot3, self.scale3)
+            self.m_model_ubo.write(self.m_model_bytes)
+            self._model_dirty = False
+
+    def update_shadow(self):
         """
         Update cube rotation based on application time.
 
         Creates continuous spinning animation.
         """
-        self.m_model = self.get_model_matrix()
-        super().update()
+        # NOTE: Scene.update() rotates the cube in place, which the rot setter cannot see
+        self._model_dirty = True
+        super().update_shadow()
+
+
+class InstancedCubeGroup(ExtendedBaseModel):
+    """
+    Group of static cubes rendered with one instanced draw call per pass.
+
+    Each instance reads its model matrix from a per-instance buffer instead of a uniform.
+    """
+
+    uses_model_ubo = False
+
+    def __init__(self, app, name, m_models, vao_name='cube', tex_id=0):
+        """
+        Initialize cube group and upload the model matrix of every instance.
+
+        :param app: Reference to main application
+        :type app: Application
+        :param name: Name to register the group's instanced VAOs under
+        :type name: str
+        :param m_models: Model matrix of each cube instance, shaped (N, 16)
+        :type m_models: numpy.ndarray
+        :param vao_name: Name of the VBO every instance shares (default: 'cube')
+        :type vao_name: str
+        :param tex_id: Texture identifier (default: 0)
+        :type tex_id: int
+        """
+        self.n_instances = len(m_models)
+        app.mesh.vao.add_instanced_vaos(name, vao_name, m_models)
+        super().__init__(app, name, tex_id, pos=(0, 0, 0), rot=(0, 0, 0), scale=(1, 1, 1))
+
+    def update(self):
+        """
+        Update dynamic uniform attributes shared by every instance.
+        """
+        self.texture.use(location=0)
+        self._u_cam_pos.write(self.camera.position)
+        self._u_m_proj_view.write(self.camera.m_proj_view)
+
+    def cache_uniforms(self):
+        """
+        Look up the uniforms written every frame once, instead of on every update.
+        """
+        self._u_cam_pos = self.program['camPos']
+        self._u_m_proj_view = self.program['m_proj_view']
+
+    def update_shadow(self):
+        """
+        Model matrices come from the instance buffer, so there is nothing to update.
+        """
+        pass
+
+    def render(self):
+        """
+        Update shared uniforms and render every instance in one draw call.
+        """
+        self.update()
+        self.vao.render(instances=self.n_instances)
+
+    def render_shadow(self):
+        """
+        Render every instance into the shadow map in one draw call.
+        """
+        self.shadow_vao.render(instances=self.n_instances)
 
 
 class Cat(ExtendedBaseModel):
@@ -242,7 +519,7 @@ class SkyBox(BaseModel):
 
         Prevents skybox from rotating with camera movement.
         """
-        self.program['m_view'].write(glm.mat4(glm.mat3(self.camera.m_view)))
+        self._u_m_view.write(self.camera.m_view_no_translation)
 
     def on_init(self):
         """
@@ -256,7 +533,9 @@ class SkyBox(BaseModel):
         self.texture.use(location=0)
         # Assign uniform matrices to a shader program
         self.program['m_proj'].write(self.camera.m_proj)
-        self.program['m_view'].write(glm.mat4(glm.mat3(self.camera.m_view)))
+        self.program['m_view'].write(self.camera.m_view_no_translation)
+        # Cache the uniform written every frame
+        self._u_m_view = self.program['m_view']
 
 
 class AdvancedSkyBox(BaseModel):
@@ -294,8 +573,7 @@ class AdvancedSkyBox(BaseModel):
 
         Converts clip coordinates back to world space for accurate texture lookup.
         """
-        m_view = glm.mat4(glm.mat3(self.camera.m_view))
-        self.program['m_invProjView'].write(glm.inverse(self.camera.m_proj * m_view))
+        self._u_inv_proj_view.write(self.camera.m_inv_proj_view_skybox)
 
     def on_init(self):
         """
@@ -307,3 +585,5 @@ class AdvancedSkyBox(BaseModel):
         self.texture = self.app.mesh.texture.textures[self.tex_id]
         self.program['u_texture_skybox'] = 0
         self.texture.use(location=0)
+        # Cache the uniform written every frame
+        self._u_inv_proj_view = self.program['m_invProjView']
@@ -3,6 +3,8 @@
 This module processes an application's scene objects
 """
 
+# Import Python modules
+import numpy as np
 
 # Import application modules
 from model import *
@@ -24,6 +26,9 @@ class Scene:
         """
         self.app = app
         self.objects = []
+        # NOTE: Bound render methods, so the render loops skip an attribute lookup per object
+        self.render_methods = []
+        self.shadow_methods = []
         self.load()
         # SkyBox
         self.skybox = AdvancedSkyBox(app)
@@ -36,6 +41,8 @@ class Scene:
         :type obj: BaseModel
         """
         self.objects.append(obj)
+        self.render_methods.append(obj.render)
+        self.shadow_methods.append(obj.render_shadow)
 
     def load(self):
         """
@@ -47,15 +54,19 @@ class Scene:
         add = self.add_object
 
         # Floor
+        # NOTE: Static cubes are drawn as instances, so we only collect their transforms
         n, s = 20, 2
-        for x in range(-n, n, s):
-            for z in range(-n, n, s):
-                add(Cube(app, pos=(x, -s, z)))
+        xs, zs = np.mgrid[-n:n:s, -n:n:s]
+        floor = np.stack([xs.ravel(), np.full(xs.size, -s), zs.ravel()], axis=1).astype('f4')
+        add(InstancedCubeGroup(app, 'floor', get_translation_matrices(floor)))
 
         # Columns
+        columns = []
         for i in range(9):
-            add(Cube(app, pos=(15, i * s, -9 + i), tex_id=2))
-            add(Cube(app, pos=(15, i * s, 5 - i), tex_id=2))
+            columns.append((15, i * s, -9 + i))
+            columns.append((15, i * s, 5 - i))
+        m_models = get_model_matrices(columns, [(0, 0, 0)] * len(columns), [(1, 1, 1)] * len(columns))
+        add(InstancedCubeGroup(app, 'columns', m_models, tex_id=2))
 
         # Cat
         add(Cat(app, pos=(0, -1, -10)))
@@ -64,6 +75,14 @@ class Scene:
         self.moving_cube = MovingCube(app, pos=(0, 6, 8), scale=(3, 3, 3), tex_id=1)
         add(self.moving_cube)
 
+    def destroy(self):
+        """
+        Release resources owned by the scene's objects.
+        """
+        for obj in self.objects:
+            obj.destroy()
+        self.skybox.destroy()
+
     def update(self):
         """
         Update dynamic objects in scene.
@@ -71,3 +90,12 @@ class Scene:
         Animates moving cube based on application time.
         """
         self.moving_cube.rot.xyz = self.app.time
+
+    def get_dynamic_state(self):
+        """
+        Summarize the state of every animated object, so renderers can tell when the scene changed.
+
+        :return: Rotation of the moving cube
+        :rtype: tuple
+        """
+        return tuple(self.moving_cube.rot)
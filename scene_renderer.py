@@ -1,4 +1,8 @@
 
+# Import application modules
+from shader_program import LIGHT_BINDING
+
+
 class SceneRenderer:
     """
     Handle multi-pass rendering including shadow mapping and main scene rendering.
@@ -20,6 +24,14 @@ class SceneRenderer:
         # Render depth buffer
         self.depth_texture = self.mesh.texture.textures['depth_texture']
         self.depth_fbo = self.ctx.framebuffer(depth_attachment=self.depth_texture)
+        # Upload the light data once and share it with every program
+        self.light_ubo = self.ctx.buffer(app.light.get_uniform_data())
+        self.light_ubo.bind_to_uniform_block(LIGHT_BINDING)
+        # Copy of the last rendered frame, reused while nothing on screen changes
+        self.cache_fbo = None
+        # NOTE: Key of the previously rendered frame, and key of the frame held in cache_fbo
+        self.last_frame_key = None
+        self.cached_frame_key = None
 
     def render_shadow(self):
         """
@@ -29,8 +41,8 @@ class SceneRenderer:
         """
         self.depth_fbo.clear()
         self.depth_fbo.use()
-        for obj in self.scene.objects:
-            obj.render_shadow()
+        for render_shadow in self.scene.shadow_methods:
+            render_shadow()
 
     def main_render(self):
         """
@@ -38,27 +50,75 @@ class SceneRenderer:
 
         Uses screen framebuffer and renders all objects plus skybox.
         """
-        self.app.ctx.screen.use()
-        for obj in self.scene.objects:
-            obj.render()
+        self.ctx.screen.use()
+        for render in self.scene.render_methods:
+            render()
         self.scene.skybox.render()
 
+    def get_frame_key(self):
+        """
+        Summarize everything that changes the rendered frame.
+
+        :return: Quantized camera pose, animated scene state, and screen size
+        :rtype: tuple
+        """
+        camera = self.app.camera
+        position = camera.position
+        return (round(position.x, 3), round(position.y, 3), round(position.z, 3),
+                round(camera.yaw, 2), round(camera.pitch, 2),
+                self.scene.get_dynamic_state(), self.ctx.screen.size)
+
+    def get_cache_fbo(self):
+        """
+        Get the framebuffer caching the last frame, recreating it if the screen was resized.
+
+        :return: Framebuffer the size of the screen
+        :rtype: Framebuffer
+        """
+        size = self.ctx.screen.size
+        if self.cache_fbo is None or self.cache_fbo.size != size:
+            if self.cache_fbo is not None:
+                self.release_cache_fbo()
+            self.cache_fbo = self.ctx.framebuffer(color_attachments=[self.ctx.texture(size, 4)])
+        return self.cache_fbo
+
     def render(self):
         """
         Execute complete rendering pipeline.
 
         Updates scene, performs shadow pass, then renders main scene.
+        Reuses a cached frame instead if the camera and scene did not change.
         """
         self.scene.update()
+        frame_key = self.get_frame_key()
+        if frame_key == self.cached_frame_key:
+            self.ctx.copy_framebuffer(self.ctx.screen, self.cache_fbo)
+            return
         # Pass 1
         self.render_shadow()
         # Pass 2
         self.main_render()
+        # NOTE: Only keep a copy once the frame repeats, so frames that keep changing do not pay for the blit
+        if frame_key == self.last_frame_key:
+            self.ctx.copy_framebuffer(self.get_cache_fbo(), self.ctx.screen)
+            self.cached_frame_key = frame_key
+        self.last_frame_key = frame_key
+
+    def release_cache_fbo(self):
+        """
+        Release the cached frame's framebuffer and color texture.
+        """
+        for texture in self.cache_fbo.color_attachments:
+            texture.release()
+        self.cache_fbo.release()
 
     def destroy(self):
         """
-        Release framebuffer resources.
+        Release framebuffer and uniform buffer resources.
 
-        Clean up depth framebuffer when renderer is destroyed.
+        Clean up depth framebuffer, light data, and cached frame when renderer is destroyed.
         """
         self.depth_fbo.release()
+        self.light_ubo.release()
+        if self.cache_fbo is not None:
+            self.release_cache_fbo()
@@ -3,6 +3,27 @@
 This module generates and destroys an application's shader programs
 """
 
+# Import Python modules
+import functools
+
+# Uniform block binding points
+LIGHT_BINDING = 0 # Light data shared by every program
+MODEL_BINDING = 1 # Model matrix of the object being drawn
+
+
+@functools.lru_cache(maxsize=None)
+def _load_shader_source(file_name):
+    """
+    Read a shader's source code from disk once.
+
+    :param file_name: Shader file name relative to the shaders directory
+    :type file_name: str
+    :return: GLSL source code
+    :rtype: str
+    """
+    with open(f'shaders/{file_name}') as file:
+        return file.read()
+
 class ShaderProgram:
     """
     Manage compilation and lifecycle of GLSL shader programs.
@@ -18,31 +39,55 @@ class ShaderProgram:
         :type ctx: ModernGL context
         """
         self.ctx = ctx
+        # NOTE: Programs by vertex shader name, and compiled programs by their (vertex, fragment) shader pair
         self.programs = {}
-        self.programs['default'] = self.get_program('default')
-        self.programs['skybox'] = self.get_program('skybox')
-        self.programs['advanced_skybox'] = self.get_program('advanced_skybox')
-        self.programs['shadow_map'] = self.get_program('shadow_map')
+        self.compiled_programs = {}
+        self.get_program('default')
+        self.get_program('skybox')
+        self.get_program('advanced_skybox')
+        self.get_program('shadow_map')
+        # NOTE: Instanced programs only swap the vertex shader
+        self.get_program('default_instanced', 'default')
+        self.get_program('shadow_map_instanced', 'shadow_map')
+        # Point each program's uniform blocks at their shared binding points
+        for program in self.programs.values():
+            light_block = program.get('LightBlock', None)
+            if light_block is not None:
+                light_block.binding = LIGHT_BINDING
+            model_block = program.get('ModelBlock', None)
+            if model_block is not None:
+                model_block.binding = MODEL_BINDING
 
-    def get_program(self, shader_program_name):
+    def get_program(self, shader_program_name, fragment_shader_name=None):
         """
-        Load and compile vertex/fragment shaders from files.
+        Load and compile vertex/fragment shaders from files, and register the program under the vertex shader's name.
 
         :param shader_program_name: Base name of shader files (without extension)
         :type shader_program_name: str
+        :param fragment_shader_name: Base name of the fragment shader file, if it differs from the vertex shader's
+        :type fragment_shader_name: str
         :return: Compiled shader program ready for use
         :rtype: ShaderProgram
         """
-        # Get the vertex shader source code
-        with open(f'shaders/{shader_program_name}.vert') as file:
-            vertex_shader = file.read()
+        if fragment_shader_name is None:
+            fragment_shader_name = shader_program_name
+
+        # NOTE: Programs are shared by every VAO that uses them, so each shader pair is only compiled once
+        key = (shader_program_name, fragment_shader_name)
+        program = self.compiled_programs.get(key)
+        if program is not None:
+            self.programs[shader_program_name] = program
+            return program
 
-        # Get the fragment shader source code
-        with open(f'shaders/{shader_program_name}.frag') as file:
-            fragment_shader = file.read()
+        # Get the vertex and fragment shader source code
+        # NOTE: Sources are cached, so programs sharing a shader file only read it once
+        vertex_shader = _load_shader_source(f'{shader_program_name}.vert')
+        fragment_shader = _load_shader_source(f'{fragment_shader_name}.frag')
 
         # Compile the vertex and fragment shader to the application
         program = self.ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
+        self.compiled_programs[key] = program
+        self.programs[shader_program_name] = program
         return program
 
     def destroy(self):
@@ -52,4 +97,5 @@ class ShaderProgram:
         Clean up all compiled shader programs.
         """
         # Release program data from memory
-        [program.release() for program in self.programs.values()]
+        for program in self.compiled_programs.values():
+            program.release()
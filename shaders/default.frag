@@ -13,16 +13,15 @@ in vec3 normal; // Normal vector in world space
 in vec3 fragPos; // Fragment position in world space
 in vec4 shadowCoord; // Shadow coordinates for shadow mapping
 
-// Light structure containing position and intensity components
-struct Light
+// Light uniform block containing position and intensity components
+// NOTE: Shared by every program through one uniform buffer; std140 pads each vec3 to 16 bytes
+layout (std140) uniform LightBlock
 {
     vec3 position; // Light position in world space
     vec3 Ia; // Ambient intensity
     vec3 Id; // Diffuse intensity
     vec3 Is; // Specular intensity
-};
-
-uniform Light light; // Light data
+} light; // Light data
 uniform sampler2D u_texture_0; // Diffuse texture
 uniform vec3 camPos; // Camera position in world space
 uniform sampler2DShadow shadowMap; // Shadow map texture
@@ -15,10 +15,13 @@ out vec3 normal; // Output normal in world space
 out vec3 fragPos; // Output fragment position in world space
 out vec4 shadowCoord; // Output shadow coordinates
 
-uniform mat4 m_proj; // Projection matrix
-uniform mat4 m_view; // View matrix
-uniform mat4 m_view_light; // Light view matrix for shadow mapping
-uniform mat4 m_model; // Model matrix
+uniform mat4 u_mvp; // Model-view-projection matrix
+uniform mat4 m_proj_view_light; // Light projection-view matrix for shadow mapping
+
+// Model matrix, read from the drawn object's buffer
+layout (std140) uniform ModelBlock {
+    mat4 m_model;
+};
 
 /*
     Shadow bias matrix for converting from [-1,1] to [0,1] range
@@ -43,10 +46,10 @@ void main()
     normal = mat3(transpose(inverse(m_model))) * normalize(in_normal);
 
     // Calculate final vertex position in clip space
-    gl_Position = m_proj * m_view * m_model * vec4(in_position, 1.0);
+    gl_Position = u_mvp * vec4(in_position, 1.0);
 
     // Calculate shadow coordinates from light perspective
-    mat4 shadowMVP = m_proj * m_view_light * m_model;
+    mat4 shadowMVP = m_proj_view_light * m_model;
     shadowCoord = m_shadow_bias * shadowMVP * vec4(in_position, 1.0);
 
     // Apply small offset to prevent shadow acne artifacts
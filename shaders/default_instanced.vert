@@ -0,0 +1,52 @@
+#version 330 core
+
+/*
+    Instanced vertex shader for 3D object rendering
+    Same as the default vertex shader, but reads the model matrix per instance
+*/
+
+layout (location = 0) in vec2 in_texcoord_0; // Texture coordinates
+layout (location = 1) in vec3 in_normal; // Vertex normal
+layout (location = 2) in vec3 in_position; // Vertex position
+layout (location = 3) in mat4 in_m_model; // Per-instance model matrix
+
+out vec2 uv_0; // Output texture coordinates
+out vec3 normal; // Output normal in world space
+out vec3 fragPos; // Output fragment position in world space
+out vec4 shadowCoord; // Output shadow coordinates
+
+uniform mat4 m_proj_view; // Projection-view matrix
+uniform mat4 m_proj_view_light; // Light projection-view matrix for shadow mapping
+
+/*
+    Shadow bias matrix for converting from [-1,1] to [0,1] range
+    Also applies small offset to prevent shadow acne
+*/
+mat4 m_shadow_bias = mat4(
+    0.5, 0.0, 0.0, 0.0,
+    0.0, 0.5, 0.0, 0.0,
+    0.0, 0.0, 0.5, 0.0,
+    0.5, 0.5, 0.5, 1.0
+);
+
+void main()
+{
+    // Pass through texture coordinates
+    uv_0 = in_texcoord_0;
+
+    // Calculate fragment position in world space
+    fragPos = vec3(in_m_model * vec4(in_position, 1.0));
+
+    // Transform normal to world space using normal matrix
+    normal = mat3(transpose(inverse(in_m_model))) * normalize(in_normal);
+
+    // Calculate final vertex position in clip space
+    gl_Position = m_proj_view * in_m_model * vec4(in_position, 1.0);
+
+    // Calculate shadow coordinates from light perspective
+    mat4 shadowMVP = m_proj_view_light * in_m_model;
+    shadowCoord = m_shadow_bias * shadowMVP * vec4(in_position, 1.0);
+
+    // Apply small offset to prevent shadow acne artifacts
+    shadowCoord.z -= 0.0005;
+}
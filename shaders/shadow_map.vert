@@ -10,7 +10,11 @@ layout (location = 2) in vec3 in_position;  // Vertex position
 
 uniform mat4 m_proj; // Projection matrix
 uniform mat4 m_view_light; // Light view matrix
-uniform mat4 m_model; // Model matrix
+
+// Model matrix, read from the drawn object's buffer
+layout (std140) uniform ModelBlock {
+    mat4 m_model;
+};
 
 void main()
 {
@@ -0,0 +1,21 @@
+#version 330 core
+
+/*
+    Instanced shadow map vertex shader
+    Transforms vertices from light perspective, reading the model matrix per instance
+*/
+
+layout (location = 2) in vec3 in_position;  // Vertex position
+layout (location = 3) in mat4 in_m_model; // Per-instance model matrix
+
+uniform mat4 m_proj; // Projection matrix
+uniform mat4 m_view_light; // Light view matrix
+
+void main()
+{
+    // Calculate model-view-projection matrix from light perspective
+    mat4 mvp = m_proj * m_view_light * in_m_model;
+
+    // Transform vertex position to light clip space
+    gl_Position = mvp * vec4(in_position, 1.0);
+}
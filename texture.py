@@ -4,9 +4,8 @@ This module processes an application's textures
 """
 
 # Import Python modules
-if __name__ == '__main__':
-    import moderngl as mgl
-    import pygame as pg
+import moderngl as mgl
+import pygame as pg
 
 
 class Texture:
@@ -103,4 +102,5 @@ class Texture:
 
         Clean up loaded textures when texture manager is destroyed.
         """
-        [tex.release() for tex in self.textures.values()]
+        for tex in self.textures.values():
+            tex.release()
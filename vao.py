@@ -3,9 +3,45 @@
 This module formats an application's Vertex Array Objects (VAOs)
 """
 
+# Import Python modules
+import re
+
 # Import application modules
 from shader_program import ShaderProgram
-from vbo import VBO
+from vbo import VBO, VBOId
+
+# NOTE: Only float attributes and padding are supported, since every binding is made as a float attribute
+ATTRIBUTE_TOKEN = re.compile(r'(\d*)([fx])(\d*)')
+# NOTE: 'f1' is a normalized byte format, so it is not a plain float
+FLOAT_SIZES = (2, 4, 8)
+
+
+def get_attribute_layout(buffer_format):
+    """
+    Split a vertex format into one format and byte offset per attribute.
+
+    :param buffer_format: ModernGL buffer format, such as '2f2 3f2 2x 3f2 2x'
+    :type buffer_format: str
+    :return: (format, offset) of each attribute, skipping padding, and the vertex stride in bytes
+    :rtype: tuple
+    :raises ValueError: If the format has anything but float attributes and padding
+    """
+    layout = []
+    offset = 0
+    for token in buffer_format.split():
+        match = ATTRIBUTE_TOKEN.fullmatch(token)
+        if match is None:
+            raise ValueError(f"Unsupported attribute '{token}' in buffer format '{buffer_format}'")
+        count, kind, size = match.groups()
+        # NOTE: Components default to 4 bytes, padding to 1 byte per 'x'
+        count = int(count or 1)
+        size = int(size or (1 if kind == 'x' else 4))
+        if kind == 'f' and size not in FLOAT_SIZES:
+            raise ValueError(f"Unsupported attribute '{token}' in buffer format '{buffer_format}'")
+        if kind != 'x':
+            layout.append((token, offset))
+        offset += count * size
+    return layout, offset
 
 
 class VAO:
@@ -17,7 +53,7 @@ class VAO:
 
     def __init__(self, ctx):
         """
-        Initialize VAO manager and create VAOs for all geometry types.
+        Initialize VAO manager and register the VAOs for all geometry types.
 
         :param ctx: ModernGL context for VAO creation
         :type ctx: ModernGL context
@@ -26,38 +62,70 @@ class VAO:
         self.vbo = VBO(ctx)
         self.program = ShaderProgram(ctx)
         self.vaos = {}
+        self.instance_buffers = {}
 
+        # NOTE: Each VAO is (shader program, VBO) and is only built, along with its VBO, when first fetched
+        self.vao_sources = {}
         # Generate a Cube VAO for a specified shader program
-        self.vaos['cube'] = self.get_vao(
-            program=self.program.programs['default'],
-            vbo=self.vbo.vbos['cube'])
-
+        self.vao_sources['cube'] = ('default', VBOId.CUBE)
         # Generate a Cube VAO shadow-map for a specified shader program
-        self.vaos['shadow_cube'] = self.get_vao(
-            program=self.program.programs['shadow_map'],
-            vbo=self.vbo.vbos['cube'])
-
+        self.vao_sources['shadow_cube'] = ('shadow_map', VBOId.CUBE)
         # Generate a Cat VAO for a specified shader program
-        self.vaos['cat'] = self.get_vao(
-            program=self.program.programs['default'],
-            vbo=self.vbo.vbos['cat'])
-
+        self.vao_sources['cat'] = ('default', VBOId.CAT)
         # Generate a Cat VAO shadow-map for a specified shader program
-        self.vaos['shadow_cat'] = self.get_vao(
-            program=self.program.programs['shadow_map'],
-            vbo=self.vbo.vbos['cat'])
-
+        self.vao_sources['shadow_cat'] = ('shadow_map', VBOId.CAT)
         # Generate a SkyBox VAO for a specified shader program
-        self.vaos['skybox'] = self.get_vao(
-            program=self.program.programs['skybox'],
-            vbo=self.vbo.vbos['skybox'])
-
+        self.vao_sources['skybox'] = ('skybox', VBOId.SKYBOX)
         # Generate an advanced SkyBox VAO for a specified shader program
-        self.vaos['advanced_skybox'] = self.get_vao(
-            program=self.program.programs['advanced_skybox'],
-            vbo=self.vbo.vbos['advanced_skybox'])
+        self.vao_sources['advanced_skybox'] = ('advanced_skybox', VBOId.ADVANCED_SKYBOX)
 
-    def get_vao(self, program, vbo):
+    def __getitem__(self, name):
+        """
+        Get a VAO by name, building it the first time it is fetched.
+
+        :param name: Name of the VAO
+        :type name: str
+        :return: Vertex array object ready for rendering
+        :rtype: VAO
+        """
+        vao = self.vaos.get(name)
+        if vao is None:
+            program_name, vbo_id = self.vao_sources[name]
+            vao = self.vaos[name] = self.get_vao(
+                program=self.program.programs[program_name],
+                vbo=self.vbo[vbo_id])
+        return vao
+
+    def add_instanced_vaos(self, name, vbo_name, m_models):
+        """
+        Create instanced VAOs for the main and shadow-map passes of a group of static objects.
+
+        Registers the VAOs as ``name`` and ``'shadow_' + name``.
+
+        :param name: Name to register the instanced VAOs under
+        :type name: str
+        :param vbo_name: Name or VBOId of the VBO every instance shares
+        :type vbo_name: str or VBOId
+        :param m_models: Per-instance model matrices packed as float32
+        :type m_models: numpy.ndarray
+        """
+        # NOTE: Static data never changes after loading, so it lives in one per-instance buffer
+        instance_buffer = self.ctx.buffer(m_models)
+        self.instance_buffers[name] = instance_buffer
+
+        # Generate an instanced VAO for the main program
+        self.vaos[name] = self.get_vao(
+            program=self.program.programs['default_instanced'],
+            vbo=self.vbo[vbo_name],
+            instance_buffer=instance_buffer)
+
+        # Generate an instanced VAO for the shadow-map program
+        self.vaos['shadow_' + name] = self.get_vao(
+            program=self.program.programs['shadow_map_instanced'],
+            vbo=self.vbo[vbo_name],
+            instance_buffer=instance_buffer)
+
+    def get_vao(self, program, vbo, instance_buffer=None):
         """
         Format VBO data into renderable VAO for specific shader.
 
@@ -65,10 +133,25 @@ class VAO:
         :type program: ShaderProgram
         :param vbo: Vertex buffer object containing geometry data
         :type vbo: VBO
+        :param instance_buffer: Optional buffer of per-instance model matrices
+        :type instance_buffer: Buffer
         :return: Vertex array object ready for rendering
         :rtype: VAO
         """
-        vao = self.ctx.vertex_array(program, [(vbo.vbo, vbo.format, *vbo.attribs)], skip_errors=True)
+        content = []
+        if instance_buffer is not None:
+            # NOTE: '/i' advances the attribute once per instance instead of once per vertex
+            content.append((instance_buffer, '16f/i', 'in_m_model'))
+        vao = self.ctx.vertex_array(program, content, skip_errors=True)
+        # NOTE: VBOs can share one buffer, so each attribute is bound at the VBO's byte offset
+        layout, stride = get_attribute_layout(vbo.format)
+        for attrib, (attrib_format, attrib_offset) in zip(vbo.attribs, layout):
+            # NOTE: Like skip_errors, skip attributes the program does not use
+            attribute = program.get(attrib, None)
+            if attribute is not None:
+                vao.bind(attribute.location, 'f', vbo.vbo, attrib_format,
+                         offset=vbo.offset + attrib_offset, stride=stride)
+        vao.vertices = vbo.size // stride
         return vao
 
     def destroy(self):
@@ -79,3 +162,5 @@ class VAO:
         """
         self.vbo.destroy()
         self.program.destroy()
+        for instance_buffer in self.instance_buffers.values():
+            instance_buffer.release()
@@ -6,21 +6,75 @@ In reality, we can use buffer objects for means outside of vertex processing.
 """
 
 # Import Python modules
-if __name__ == '__main__':
-    import numpy as np
-    import pywavefront
+import gzip
+import json
+import mmap
+import numpy as np
+import os
+import pywavefront
+import struct
+from enum import IntEnum
+
+# Corners of a unit cube centered at the origin, shared by the cube and skybox VBOs
+# NOTE: Tables are flat, so NumPy converts them without a tuple per row; reshape to (8, 3)
+CUBE_VERTICES = (-1, -1,  1,   1, -1,  1,   1,  1,  1,  -1,  1,  1,
+                 -1,  1, -1,  -1, -1, -1,   1, -1, -1,   1,  1, -1)
+
+# Two counter-clockwise triangles per face, indexing CUBE_VERTICES
+CUBE_INDICES = (0, 2, 3,  0, 1, 2,
+                1, 7, 2,  1, 6, 7,
+                6, 5, 4,  4, 7, 6,
+                3, 4, 5,  3, 5, 0,
+                3, 7, 4,  3, 2, 7,
+                0, 6, 1,  0, 5, 6)
+
+
+class VBOId(IntEnum):
+    """
+    Index of each VBO in the VBO manager.
+    """
+    CUBE = 0
+    CAT = 1
+    SKYBOX = 2
+    ADVANCED_SKYBOX = 3
+
+
+# NOTE: Lets callers keep fetching VBOs by name, such as 'cube' or 'advanced_skybox'
+VBO_IDS = {vbo_id.name.lower(): vbo_id for vbo_id in VBOId}
 
 
 class VBO:
+    __slots__ = ('ctx', 'vbo_classes', 'vbos', 'shared_buffer')
+
     def __init__(self, ctx):
-        self.vbos = {}
-        self.vbos['cube'] = CubeVBO(ctx)
-        self.vbos['cat'] = CatVBO(ctx)
-        self.vbos['skybox'] = SkyBoxVBO(ctx)
-        self.vbos['advanced_skybox'] = AdvancedSkyBoxVBO(ctx)
+        self.ctx = ctx
+        # NOTE: Both tables are indexed by VBOId, instead of hashing a name on every fetch
+        self.vbo_classes = (CubeVBO, CatVBO, SkyBoxVBO, AdvancedSkyBoxVBO)
+        # NOTE: VBOs with their own buffer are only built the first time they are fetched, so unused assets cost nothing
+        self.vbos = [None] * len(VBOId)
+        # NOTE: Fixed geometry is tiny, so it is packed up front into one buffer, at a byte offset per VBO
+        shared_bytes = {vbo_id: vbo_class.get_vertex_bytes()
+                        for vbo_id, vbo_class in enumerate(self.vbo_classes) if vbo_class.shared}
+        self.shared_buffer = ctx.buffer(b''.join(shared_bytes.values()))
+        offset = 0
+        for vbo_id, vertex_bytes in shared_bytes.items():
+            self.vbos[vbo_id] = self.vbo_classes[vbo_id](
+                ctx, buffer=self.shared_buffer, offset=offset, size=len(vertex_bytes))
+            offset += len(vertex_bytes)
+
+    def __getitem__(self, vbo_id):
+        if isinstance(vbo_id, str):
+            vbo_id = VBO_IDS[vbo_id]
+        vbo = self.vbos[vbo_id]
+        if vbo is None:
+            vbo = self.vbos[vbo_id] = self.vbo_classes[vbo_id](self.ctx)
+        return vbo
 
     def destroy(self):
-        [vbo.destroy() for vbo in self.vbos.values()]
+        for vbo in self.vbos:
+            if vbo is not None:
+                vbo.destroy()
+        self.shared_buffer.release()
 
 
 class BaseVBO:
@@ -30,18 +84,50 @@ class BaseVBO:
     Provides common VBO functionality that subclasses extend with specific geometry.
     """
 
-    def __init__(self, ctx):
+    # NOTE: Slots drop the per-instance __dict__; subclasses declare empty slots to keep it that way
+    __slots__ = ('ctx', 'owns_buffer', 'vbo', 'offset', 'size', 'format', 'attribs')
+
+    # NOTE: Subclasses with fixed geometry set this, so their vertex data is only generated once per process
+    # and stored in the buffer VBO shares between them
+    shared = False
+    _vertex_bytes = None
+
+    def __init__(self, ctx, buffer=None, offset=0, size=None):
         """
         Initialize base VBO with context and create vertex buffer.
 
         :param ctx: ModernGL context for buffer creation
         :type ctx: ModernGL context
+        :param buffer: Shared buffer already holding the vertex data, or None to create one
+        :type buffer: Buffer
+        :param offset: Byte offset of the vertex data in the buffer
+        :type offset: int
+        :param size: Byte length of the vertex data, or None for the whole buffer
+        :type size: int
         """
         self.ctx = ctx
-        self.vbo = self.get_vbo()
+        # NOTE: Only release the buffer if this VBO created it
+        self.owns_buffer = buffer is None
+        self.vbo = self.get_vbo() if buffer is None else buffer
+        self.offset = offset
+        self.size = self.vbo.size if size is None else size
         self.format: str = None
         self.attribs: list = None
 
+    @classmethod
+    def get_vertex_bytes(cls):
+        """
+        Get the vertex data as bytes, generating it only the first time.
+
+        :return: Vertex data bytes
+        :rtype: bytes
+        """
+        if cls._vertex_bytes is None:
+            vertex_data = cls.get_vertex_data()
+            # NOTE: Vertex data may already be packed bytes instead of a NumPy array
+            cls._vertex_bytes = vertex_data if isinstance(vertex_data, bytes) else vertex_data.tobytes()
+        return cls._vertex_bytes
+
     def get_vertex_data(self):
         """
         Get vertex data for specific geometry.
@@ -67,7 +153,8 @@ class BaseVBO:
 
         Clean up VBO when no longer needed.
         """
-        self.vbo.release()
+        if self.owns_buffer:
+            self.vbo.release()
 
 
 class CubeVBO(BaseVBO):
@@ -77,15 +164,21 @@ class CubeVBO(BaseVBO):
     Generates vertex data for a unit cube centered at origin.
     """
 
-    def __init__(self, ctx):
+    __slots__ = ()
+    shared = True
+
+    def __init__(self, ctx, **kwargs):
         """
         Initialize cube VBO with vertex format and attributes.
 
         :param ctx: ModernGL context for buffer creation
         :type ctx: ModernGL context
+        :param kwargs: Shared buffer, offset, and size, as in BaseVBO
+        :type kwargs: dict
         """
-        super().__init__(ctx)
-        self.format = '2f 3f 3f'
+        super().__init__(ctx, **kwargs)
+        # NOTE: Every component is 0 or +-1, which half floats store exactly; the pads keep attributes 4-byte aligned
+        self.format = '2f2 3f2 2x 3f2 2x'
         self.attribs = ['in_texcoord_0', 'in_normal', 'in_position']
 
     @staticmethod
@@ -100,11 +193,13 @@ class CubeVBO(BaseVBO):
         :return: NumPy array of vertex data in order specified by indices
         :rtype: numpy.ndarray
         """
-        # NOTE: Uses list comprehension to Outputs large list of tuples!
-        data = [vertices[ind] for triangle in indices for ind in triangle]
-        return np.array(data, dtype='f4')
+        # NOTE: One vectorized gather, instead of building a list of tuples in Python
+        vertices = np.asarray(vertices, dtype='f4')
+        indices = np.asarray(indices, dtype=np.intp).reshape(-1)
+        return vertices[indices]
 
-    def get_vertex_data(self):
+    @classmethod
+    def get_vertex_data(cls):
         """
         Generate complete vertex data for cube including positions, normals, and texture coordinates.
 
@@ -112,41 +207,39 @@ class CubeVBO(BaseVBO):
         :rtype: numpy.ndarray
         """
         # Get vertex coordinates
-        vertices = [(-1, -1, 1), ( 1, -1,  1), (1,  1,  1), (-1, 1,  1),
-                    (-1, 1, -1), (-1, -1, -1), (1, -1, -1), ( 1, 1, -1)]
-
-        indices = [(0, 2, 3), (0, 1, 2),
-                   (1, 7, 2), (1, 6, 7),
-                   (6, 5, 4), (4, 7, 6),
-                   (3, 4, 5), (3, 5, 0),
-                   (3, 7, 4), (3, 2, 7),
-                   (0, 6, 1), (0, 5, 6)]
-        vertex_data = self.get_data(vertices, indices)
+        vertices = np.array(CUBE_VERTICES, dtype='f4').reshape(8, 3)
+        vertex_data = cls.get_data(vertices, CUBE_INDICES)
 
         # Get texture coordinates
-        tex_coord_vertices = [(0, 0), (1, 0), (1, 1), (0, 1)]
-        tex_coord_indices = [(0, 2, 3), (0, 1, 2),
-                             (0, 2, 3), (0, 1, 2),
-                             (0, 1, 2), (2, 3, 0),
-                             (2, 3, 0), (2, 0, 1),
-                             (0, 2, 3), (0, 1, 2),
-                             (3, 1, 2), (3, 0, 1),]
-        tex_coord_data = self.get_data(tex_coord_vertices, tex_coord_indices)
+        tex_coord_vertices = np.array((0, 0,  1, 0,  1, 1,  0, 1), dtype='f4').reshape(4, 2)
+        tex_coord_indices = (0, 2, 3,  0, 1, 2,
+                             0, 2, 3,  0, 1, 2,
+                             0, 1, 2,  2, 3, 0,
+                             2, 3, 0,  2, 0, 1,
+                             0, 2, 3,  0, 1, 2,
+                             3, 1, 2,  3, 0, 1)
+        tex_coord_data = cls.get_data(tex_coord_vertices, tex_coord_indices)
 
         # Get normals
-        # NOTE: Multiply tuples by 6 because each face, which has 6 vertices, have the same normal
-        normals = [( 0, 0, 1) * 6,
-                   ( 1, 0, 0) * 6,
-                   ( 0, 0,-1) * 6,
-                   (-1, 0, 0) * 6,
-                   ( 0, 1, 0) * 6,
-                   ( 0,-1, 0) * 6,]
-        normals = np.array(normals, dtype='f4').reshape(36, 3)
-
-        # NOTE: We horizontally concat per-vertex data
-        vertex_data = np.hstack([normals, vertex_data])
-        vertex_data = np.hstack([tex_coord_data, vertex_data])
-        return vertex_data
+        face_normals = np.array(( 0, 0, 1,
+                                  1, 0, 0,
+                                  0, 0,-1,
+                                 -1, 0, 0,
+                                  0, 1, 0,
+                                  0,-1, 0), dtype='f4').reshape(6, 3)
+        # NOTE: Repeat each normal 6 times because each face, which has 6 vertices, have the same normal
+        normals = np.repeat(face_normals, 6, axis=0)
+
+        # NOTE: We interleave per-vertex data into one record per vertex, laid out exactly as the '2f2 3f2 2x 3f2 2x' format
+        vertex_dtype = np.dtype({'names': ['in_texcoord_0', 'in_normal', 'in_position'],
+                                 'formats': [('<f2', 2), ('<f2', 3), ('<f2', 3)],
+                                 'offsets': [0, 4, 12],
+                                 'itemsize': 20})
+        interleaved = np.zeros(36, dtype=vertex_dtype)
+        interleaved['in_texcoord_0'] = tex_coord_data
+        interleaved['in_normal'] = normals
+        interleaved['in_position'] = vertex_data
+        return interleaved
 
 
 class CatVBO(BaseVBO):
@@ -156,6 +249,8 @@ class CatVBO(BaseVBO):
     Uses pywavefront to load complex mesh data with textures and normals.
     """
 
+    __slots__ = ()
+
     def __init__(self, app):
         """
         Initialize cat VBO with vertex format and attributes.
@@ -167,6 +262,82 @@ class CatVBO(BaseVBO):
         self.format = '2f 3f 3f'
         self.attribs = ['in_texcoord_0', 'in_normal', 'in_position']
 
+    obj_path = 'objects/cat/20430_Cat_v1_NEW.obj'
+    # NOTE: Raw float32 vertex data in the '2f 3f 3f' layout, written after the first load
+    vbo_cache_path = 'objects/cat/cat.vbo.bin'
+    # Byte size of one vertex in the '2f 3f 3f' layout
+    vertex_size = 32
+
+    @staticmethod
+    def load_vbo_cache(vbo_cache_path, obj_path):
+        """
+        Map the raw vertex data cache into memory, if it is newer than the OBJ file.
+
+        :param vbo_cache_path: Path of the raw vertex data cache
+        :type vbo_cache_path: str
+        :param obj_path: Path of the OBJ file the cache was written for
+        :type obj_path: str
+        :return: Read-only NumPy view of the mapped vertex data, or None if there is no usable cache
+        :rtype: numpy.ndarray
+        """
+        if not os.path.exists(vbo_cache_path) or os.path.getmtime(vbo_cache_path) < os.path.getmtime(obj_path):
+            return None
+        # NOTE: An empty or truncated cache cannot hold whole vertices, so fall back to the slower loaders
+        size = os.path.getsize(vbo_cache_path)
+        if size == 0 or size % CatVBO.vertex_size != 0:
+            return None
+        with open(vbo_cache_path, 'rb') as file:
+            # NOTE: The mapping stays valid after the file is closed, and the view keeps it alive
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return np.frombuffer(mapping, dtype='f4')
+
+    @staticmethod
+    def save_vbo_cache(vbo_cache_path, vertex_data):
+        """
+        Write the raw vertex data cache, leaving no partial file behind if writing fails.
+
+        :param vbo_cache_path: Path of the raw vertex data cache
+        :type vbo_cache_path: str
+        :param vertex_data: Vertex data to cache
+        :type vertex_data: numpy.ndarray
+        """
+        temp_path = f'{vbo_cache_path}.{os.getpid()}.tmp'
+        try:
+            vertex_data.tofile(temp_path)
+            # NOTE: The rename is atomic, so readers only ever see a complete cache
+            os.replace(temp_path, vbo_cache_path)
+        except OSError:
+            # NOTE: The cache is optional, e.g. on a read-only checkout the next launch just loads the slower way
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def load_cached_vertex_data(obj_path, vertex_format='T2F_N3F_V3F'):
+        """
+        Read the vertex data straight from pywavefront's cache, without parsing the OBJ file.
+
+        :param obj_path: Path of the OBJ file the cache was written for
+        :type obj_path: str
+        :param vertex_format: Interleaved layout the cached vertices must have
+        :type vertex_format: str
+        :return: NumPy array containing the cached vertex data, or None if there is no usable cache
+        :rtype: numpy.ndarray
+        """
+        bin_path, meta_path = obj_path + '.bin', obj_path + '.json'
+        if not (os.path.exists(bin_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path) as file:
+            vertex_buffers = json.load(file)['vertex_buffers']
+        # NOTE: Matches objs.materials.popitem() below, which takes the last material
+        vertex_buffer = vertex_buffers[-1]
+        if vertex_buffer['vertex_format'] != vertex_format:
+            return None
+        # NOTE: pywavefront gzips the cache, so the floats are read with one decompress instead of a Python list
+        with gzip.open(bin_path, 'rb') as file:
+            file.seek(vertex_buffer['byte_offset'])
+            data = file.read(vertex_buffer['byte_length'])
+        return np.frombuffer(data, dtype='f4')
+
     def get_vertex_data(self):
         """
         Load cat model vertex data from OBJ file.
@@ -174,10 +345,18 @@ class CatVBO(BaseVBO):
         :return: NumPy array containing cat mesh vertex data
         :rtype: numpy.ndarray
         """
-        objs = pywavefront.Wavefront('objects/cat/20430_Cat_v1_NEW.obj', cache=True, parse=True)
-        obj = objs.materials.popitem()[1]
-        vertex_data = obj.vertices
-        vertex_data = np.array(vertex_data, dtype='f4')
+        vertex_data = self.load_vbo_cache(self.vbo_cache_path, self.obj_path)
+        if vertex_data is not None:
+            return vertex_data
+        vertex_data = self.load_cached_vertex_data(self.obj_path)
+        if vertex_data is None:
+            # NOTE: The first run parses the OBJ file and writes the cache read above
+            objs = pywavefront.Wavefront(self.obj_path, cache=True, parse=True)
+            obj = objs.materials.popitem()[1]
+            vertex_data = obj.vertices
+            # NOTE: The vertices are a flat sequence of Python floats, so fill a preallocated array without inspecting nesting
+            vertex_data = np.fromiter(vertex_data, dtype='f4', count=len(vertex_data))
+        self.save_vbo_cache(self.vbo_cache_path, vertex_data)
         return vertex_data
 
 
@@ -188,15 +367,21 @@ class SkyBoxVBO(BaseVBO):
     Generates inside-out cube geometry for skybox rendering.
     """
 
-    def __init__(self, ctx):
+    __slots__ = ()
+    shared = True
+
+    def __init__(self, ctx, **kwargs):
         """
         Initialize skybox VBO with vertex format and attributes.
 
         :param ctx: ModernGL context for buffer creation
         :type ctx: ModernGL context
+        :param kwargs: Shared buffer, offset, and size, as in BaseVBO
+        :type kwargs: dict
         """
-        super().__init__(ctx)
-        self.format = '3f'
+        super().__init__(ctx, **kwargs)
+        # NOTE: The corners are +-1, which half floats store exactly; the pad keeps vertices 4-byte aligned
+        self.format = '3f2 2x'
         self.attribs = ['in_position']
 
     @staticmethod
@@ -211,11 +396,13 @@ class SkyBoxVBO(BaseVBO):
         :return: NumPy array of vertex data in order specified by indices
         :rtype: numpy.ndarray
         """
-        # NOTE: Uses list comprehension to Outputs large list of tuples!
-        data = [vertices[ind] for triangle in indices for ind in triangle]
-        return np.array(data, dtype='f4')
+        # NOTE: One vectorized gather, instead of building a list of tuples in Python
+        vertices = np.asarray(vertices, dtype='f4')
+        indices = np.asarray(indices, dtype=np.intp).reshape(-1)
+        return vertices[indices]
 
-    def get_vertex_data(self):
+    @classmethod
+    def get_vertex_data(cls):
         """
         Generate vertex data for inside-out skybox cube.
 
@@ -223,17 +410,10 @@ class SkyBoxVBO(BaseVBO):
         :rtype: numpy.ndarray
         """
         # Get vertex coordinates
-        vertices = [(-1, -1, 1), ( 1, -1,  1), (1,  1,  1), (-1, 1,  1),
-                    (-1, 1, -1), (-1, -1, -1), (1, -1, -1), ( 1, 1, -1)]
-
-        indices = [(0, 2, 3), (0, 1, 2),
-                   (1, 7, 2), (1, 6, 7),
-                   (6, 5, 4), (4, 7, 6),
-                   (3, 4, 5), (3, 5, 0),
-                   (3, 7, 4), (3, 2, 7),
-                   (0, 6, 1), (0, 5, 6)]
-        vertex_data = self.get_data(vertices, indices)
-        vertex_data = np.flip(vertex_data, 1).copy(order='C')
+        # NOTE: Reverse each of the 8 corners to (z, y, x) before the gather, which already outputs a contiguous copy
+        vertices = np.array(CUBE_VERTICES, dtype='f4').reshape(8, 3)[:, ::-1]
+        vertex_data = np.zeros((36, 4), dtype='f2')
+        vertex_data[:, 0:3] = cls.get_data(vertices, CUBE_INDICES)
         return vertex_data
 
 
@@ -244,26 +424,33 @@ class AdvancedSkyBoxVBO(BaseVBO):
     Generates a large triangle that covers the entire screen for skybox projection.
     """
 
-    def __init__(self, ctx):
+    __slots__ = ()
+    shared = True
+
+    def __init__(self, ctx, **kwargs):
         """
         Initialize advanced skybox VBO with vertex format and attributes.
 
         :param ctx: ModernGL context for buffer creation
         :type ctx: ModernGL context
+        :param kwargs: Shared buffer, offset, and size, as in BaseVBO
+        :type kwargs: dict
         """
-        super().__init__(ctx)
+        super().__init__(ctx, **kwargs)
+        # NOTE: Stays float32, since z = 0.9999 rounds to 1.0 as a half float and would fail the depth test
         self.format = '3f'
         self.attribs = ['in_position']
 
-    def get_vertex_data(self):
+    @classmethod
+    def get_vertex_data(cls):
         """
         Generate vertex data for fullscreen triangle.
 
-        :return: NumPy array containing three vertices that cover screen space
-        :rtype: numpy.ndarray
+        :return: Packed float32 bytes of three vertices that cover screen space
+        :rtype: bytes
         """
         # NOTE: Generates a fullscreen quad through a large triangle
         z = 0.9999
-        vertices = [(-1, -1, z), (3, -1, z), (-1, 3, z)]
-        vertex_data = np.array(vertices, dtype='f4')
+        # NOTE: 9 floats are packed directly, since a NumPy array would cost more than the data
+        vertex_data = struct.pack('<9f', -1, -1, z,  3, -1, z,  -1, 3, z)
         return vertex_data